@@ -166,6 +166,12 @@ app_license = "mit"
 # 	],
 # }
 
+scheduler_events = {
+	"hourly": [
+		"plm_bom.plm_bom.doctype.plm_bom_import_tool.plm_bom_import_tool.restore_interrupted_index_loads"
+	],
+}
+
 # Testing
 # -------
 
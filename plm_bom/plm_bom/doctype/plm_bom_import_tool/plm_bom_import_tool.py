@@ -2,12 +2,120 @@
 # For license information, please see license.txt
 
 import csv
+import json
+import re
+import sys
+from contextlib import closing, contextmanager, nullcontext
+from io import BytesIO
+from itertools import islice
 
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import cint, cstr, flt
-from frappe.utils.xlsxutils import read_xls_file_from_attached_file, read_xlsx_file_from_attached_file
+from frappe.utils import cint, cstr, flt, now
+from frappe.utils.background_jobs import is_job_enqueued
+from frappe.utils.xlsxutils import read_xls_file_from_attached_file
+from openpyxl import load_workbook
+
+ITEM_BATCH_SIZE = 1000
+CSV_READ_BUFFER_SIZE = 1 << 20
+ITEM_SAVEPOINT = "plm_bom_import_items"
+ITEM_GROUP_SAVEPOINT = "plm_bom_import_item_group"
+ITEM_IMPORT_JOB_TIMEOUT = 4 * 60 * 60
+
+# Fast Bulk Mode drops indexes on the shared tabItem, so it is locked table-wide rather than per tool
+FAST_BULK_JOB_ID = "plm_bom_import_items::fast_bulk_mode"
+INDEX_RESTORE_JOB_ID = "plm_bom_restore_item_indexes"
+# global default, out of reach of the tool's REST API, holding the Item indexes a load has dropped
+DEFERRED_INDEXES_KEY = "plm_bom_deferred_item_indexes"
+DEFERRED_INDEX_TABLE = "tabItem"
+INDEX_NAME_PATTERN = re.compile(r"\w{1,64}")
+
+HEADER_ALIASES = {
+	"number": "item_code",
+	"item_code": "item_code",
+	"code": "item_code",
+	"name": "item_name",
+	"item_name": "item_name",
+	"description": "description",
+	"gst_hsn_code": "gst_hsn_code",
+	"gst_hsn": "gst_hsn_code",
+	"hsn_code": "gst_hsn_code",
+	"material": "custom_material",
+	"length": "custom_length",
+	"width": "custom_width",
+	"height": "custom_height",
+	"diameter": "custom_diameter",
+	"thickness": "custom_thickness",
+	"weight": "custom_weight",
+	"part_type": "item_group",
+	"parttype": "item_group",
+	"item_group": "item_group",
+	"uom": "stock_uom",
+	"stock_uom": "stock_uom",
+	"structure_level": "structure_level",
+	"level": "structure_level",
+	"structurelevel": "structure_level",
+	"qty": "qty",
+	"quantity": "qty",
+}
+
+HEADER_SCRUB_TABLE = str.maketrans({" ": "_", "-": "_"})
+
+# low-cardinality columns whose values repeat across thousands of rows
+INTERNED_FIELDS = ("item_group", "stock_uom", "custom_material")
+
+# log entries are kept as (template, *format args) and formatted once at the end
+LOG_MISSING_ITEM_CODE = "Row {0}: skipped (missing item code)."
+LOG_MISSING_ITEM_GROUP = "Row {0}: skipped {1} (missing part type / item group)."
+LOG_ITEM_GROUP_FAILED = "Row {0}: failed {1} (could not create item group)."
+LOG_DUPLICATE = "Row {0}: duplicate {1} (already exists)."
+LOG_CREATED = "Row {0}: created {1}."
+LOG_FAILED = "Row {0}: failed {1} (see error log)."
+LOG_UNKNOWN_UOM = "Row {0}: failed {1} (UOM {2} not found)."
+LOG_UNKNOWN_GST_HSN_CODE = "Row {0}: failed {1} (GST HSN Code {2} not found)."
+LOG_NO_PARENT = "Row {0}: skipped {1} (no parent found)."
+LOG_ITEM_NOT_FOUND = "Row {0}: skipped {1} (item not found)."
+
+AUDIT_FIELDS = ("owner", "modified_by", "creation", "modified", "docstatus")
+
+# numeric Item fields, stored as 0 when the cell is empty
+ITEM_DIMENSION_FIELDS = (
+	"custom_length",
+	"custom_width",
+	"custom_height",
+	"custom_diameter",
+	"custom_thickness",
+	"custom_weight",
+)
+
+ITEM_FIELDS = (
+	"name",
+	"item_code",
+	"item_name",
+	"stock_uom",
+	"description",
+	"gst_hsn_code",
+	"custom_material",
+	*ITEM_DIMENSION_FIELDS,
+	# resolved against Item Group after preparation, so kept apart from the parsed values
+	"item_group",
+	*AUDIT_FIELDS,
+)
+
+STOCK_UOM_INDEX = ITEM_FIELDS.index("stock_uom")
+GST_HSN_CODE_INDEX = ITEM_FIELDS.index("gst_hsn_code")
+
+UOM_CONVERSION_FIELDS = (
+	"name",
+	"parent",
+	"parenttype",
+	"parentfield",
+	"idx",
+	"uom",
+	"conversion_factor",
+	*AUDIT_FIELDS,
+)
 
 
 class PLMBOMImportTool(Document):
@@ -20,85 +128,196 @@ def import_items(docname):
 	if not doc.plm_file:
 		frappe.throw(_("Please attach a PLM file before creating items."))
 
-	file_doc, extension = get_file(doc.plm_file)
-	rows = load_rows(file_doc, extension)
+	if not doc.fast_bulk_mode:
+		return create_items(doc)
 
-	if not rows or len(rows) < 2:
-		frappe.throw(_("No data found in the attached file."))
+	# Fast Bulk Mode runs DDL on tabItem, so keep it to System Managers and off the web worker
+	frappe.only_for("System Manager")
+	get_file(doc.plm_file)
 
-	header_map = build_header_map(rows[0])
-	if "item_code" not in header_map.values():
-		frappe.throw(_("Missing required column: Number / Item Code."))
+	if is_job_enqueued(FAST_BULK_JOB_ID):
+		frappe.throw(_("A Fast Bulk Mode item import is already running. Please try again once it finishes."))
 
-	logs = []
-	created = 0
-	duplicates = 0
-	skipped = 0
-	errors = 0
+	if frappe.db.get_global(DEFERRED_INDEXES_KEY):
+		# an earlier load died with the Item indexes dropped, rebuild them before starting another
+		frappe.enqueue(
+			restore_deferred_item_indexes,
+			queue="long",
+			timeout=ITEM_IMPORT_JOB_TIMEOUT,
+			job_id=INDEX_RESTORE_JOB_ID,
+			deduplicate=True,
+		)
+		frappe.throw(
+			_(
+				"Item indexes dropped by an interrupted Fast Bulk Mode import are being rebuilt. "
+				"Please try again once that finishes."
+			)
+		)
 
-	for row_idx, row in enumerate(rows[1:], start=2):
-		if not any(row):
-			continue
+	frappe.enqueue(
+		create_items_in_background,
+		queue="long",
+		timeout=ITEM_IMPORT_JOB_TIMEOUT,
+		job_id=FAST_BULK_JOB_ID,
+		deduplicate=True,
+		enqueue_after_commit=True,
+		docname=docname,
+	)
 
-		row_data = extract_row_data(row, header_map)
-		item_code = cstr(row_data.get("item_code")).strip()
-		if not item_code:
-			logs.append(f"Row {row_idx}: skipped (missing item code).")
-			skipped += 1
-			continue
+	summary = _("Item creation has been queued. The log will be updated when it finishes.")
+	return {"summary": summary}
 
-		item_group = cstr(row_data.get("item_group")).strip()
-		if not item_group:
-			logs.append(f"Row {row_idx}: skipped {item_code} (missing part type / item group).")
-			skipped += 1
-			continue
 
-		try:
-			item_group = ensure_item_group(item_group)
-		except Exception:
-			logs.append(f"Row {row_idx}: failed {item_code} (could not create item group).")
-			errors += 1
-			continue
+def create_items_in_background(docname):
+	"""Run a Fast Bulk Mode import and report the outcome, since nobody is waiting on the request."""
+	doc = frappe.get_doc("PLM BOM Import Tool", docname)
+	try:
+		message = create_items(doc, fast_bulk_mode=True)["summary"]
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(
+			title=f"PLM BOM Import Tool: item creation failed for {docname}",
+			reference_doctype=doc.doctype,
+			reference_name=docname,
+		)
+		message = _("Item creation failed: {0}").format(cstr(e) or type(e).__name__)
+		doc.db_set("item_creation_log", message)
+		frappe.db.commit()
 
-		if frappe.db.exists("Item", item_code):
-			logs.append(f"Row {row_idx}: duplicate {item_code} (already exists).")
-			duplicates += 1
-			continue
+	frappe.publish_realtime(
+		"msgprint", message, doctype=doc.doctype, docname=docname, user=frappe.session.user
+	)
 
-		try:
-			item_doc = frappe.new_doc("Item")
-			item_doc.item_code = item_code
-			item_doc.item_name = cstr(row_data.get("item_name")).strip() or item_code
-			item_doc.item_group = item_group
-			item_doc.stock_uom = cstr(row_data.get("stock_uom")).strip() or "Nos"
-
-			if row_data.get("description"):
-				item_doc.description = row_data.get("description")
-			if row_data.get("gst_hsn_code"):
-				item_doc.gst_hsn_code = cstr(row_data.get("gst_hsn_code")).strip()
-
-			item_doc.custom_material = row_data.get("custom_material")
-			item_doc.custom_length = flt(row_data.get("custom_length")) if row_data.get("custom_length") else 0
-			item_doc.custom_width = flt(row_data.get("custom_width")) if row_data.get("custom_width") else 0
-			item_doc.custom_height = flt(row_data.get("custom_height")) if row_data.get("custom_height") else 0
-			item_doc.custom_diameter = flt(row_data.get("custom_diameter")) if row_data.get("custom_diameter") else 0
-			item_doc.custom_thickness = (
-				flt(row_data.get("custom_thickness")) if row_data.get("custom_thickness") else 0
-			)
-			item_doc.custom_weight = flt(row_data.get("custom_weight")) if row_data.get("custom_weight") else 0
 
-			item_doc.insert(ignore_permissions=True)
-			created += 1
-			logs.append(f"Row {row_idx}: created {item_code}.")
-		except Exception:
-			logs.append(f"Row {row_idx}: failed {item_code} (see error log).")
-			errors += 1
+def create_items(doc, fast_bulk_mode=False):
+	file_doc, extension = get_file(doc.plm_file)
+
+	timestamp = now()
+	audit_values = (frappe.session.user, frappe.session.user, timestamp, timestamp, 0)
+
+	# casefolded, since Item names compare case-insensitively in the database
+	existing_items = set()
+	# raw Part Type -> Item Group name, or None if the group could not be created
+	group_cache = {}
+	# casefolded name -> stored name of the Link targets bulk insert does not validate
+	uom_names = {}
+	gst_hsn_codes = {}
+	logs = []
+	row_count = 0
+	created = 0
+	duplicates = 0
+	skipped = 0
+	errors = 0
+
+	with closing(load_rows(file_doc, extension)) as rows:
+		header_map = read_header_map(rows)
+		if "item_code" not in header_map.values():
+			frappe.throw(_("Missing required column: Number / Item Code."))
+
+		read_row = build_row_reader(header_map)
+
+		index_context = deferred_item_indexes() if fast_bulk_mode else nullcontext()
+		with index_context:
+			for chunk in iter_chunks(enumerate(rows, start=2), ITEM_BATCH_SIZE):
+				row_count += len(chunk)
+				prepared = prepare_item_rows(chunk, read_row)
+
+				item_codes = {item_code for _row_idx, item_code, _item_group, _values in prepared}
+				item_groups = {item_group for _row_idx, _item_code, item_group, _values in prepared}
+				existing_items.update(
+					get_existing_names(
+						"Item", {code for code in item_codes if code.casefold() not in existing_items}
+					)
+				)
+				uom_names.update(
+					get_existing_names(
+						"UOM",
+						{
+							uom
+							for _row_idx, _item_code, _item_group, values in prepared
+							if (uom := values[STOCK_UOM_INDEX]).casefold() not in uom_names
+						},
+					)
+				)
+				gst_hsn_codes.update(
+					get_existing_names(
+						"GST HSN Code",
+						{
+							hsn_code
+							for _row_idx, _item_code, _item_group, values in prepared
+							if (hsn_code := values[GST_HSN_CODE_INDEX])
+							and hsn_code.casefold() not in gst_hsn_codes
+						},
+					)
+				)
+				existing_groups = get_existing_names("Item Group", item_groups.difference(group_cache))
+				group_cache.update(
+					(item_group, existing_groups[item_group.casefold()])
+					for item_group in item_groups
+					if item_group.casefold() in existing_groups
+				)
+
+				pending = []
+				for row_idx, item_code, item_group, values in prepared:
+					if not item_code:
+						logs.append((LOG_MISSING_ITEM_CODE, row_idx, item_code))
+						skipped += 1
+						continue
+
+					if not item_group:
+						logs.append((LOG_MISSING_ITEM_GROUP, row_idx, item_code))
+						skipped += 1
+						continue
+
+					if item_group not in group_cache:
+						try:
+							group_cache[item_group] = ensure_item_group(item_group)
+						except Exception:
+							group_cache[item_group] = None
+
+					item_group = group_cache[item_group]
+					if not item_group:
+						logs.append((LOG_ITEM_GROUP_FAILED, row_idx, item_code))
+						errors += 1
+						continue
+
+					if item_code.casefold() in existing_items:
+						logs.append((LOG_DUPLICATE, row_idx, item_code))
+						duplicates += 1
+						continue
+
+					stock_uom = values[STOCK_UOM_INDEX]
+					if stock_uom.casefold() not in uom_names:
+						logs.append((LOG_UNKNOWN_UOM, row_idx, item_code, stock_uom))
+						errors += 1
+						continue
+					values[STOCK_UOM_INDEX] = uom_names[stock_uom.casefold()]
+
+					gst_hsn_code = values[GST_HSN_CODE_INDEX]
+					if gst_hsn_code:
+						if gst_hsn_code.casefold() not in gst_hsn_codes:
+							logs.append((LOG_UNKNOWN_GST_HSN_CODE, row_idx, item_code, gst_hsn_code))
+							errors += 1
+							continue
+						values[GST_HSN_CODE_INDEX] = gst_hsn_codes[gst_hsn_code.casefold()]
+
+					pending.append((len(logs), row_idx, (*values, item_group, *audit_values)))
+					existing_items.add(item_code.casefold())
+					created += 1
+					logs.append((LOG_CREATED, row_idx, item_code))
+
+				failed = flush_items(pending, logs)
+				existing_items.difference_update(item_code.casefold() for item_code in failed)
+				created -= len(failed)
+				errors += len(failed)
+
+	if not row_count:
+		frappe.throw(_("No data found in the attached file."))
 
 	summary = (
 		f"Created: {created}, Duplicates: {duplicates}, Skipped: {skipped}, Errors: {errors}."
 	)
-	logs.insert(0, summary)
-	doc.item_creation_log = "\n".join(logs)
+	doc.item_creation_log = format_logs(summary, logs)
 	doc.save(ignore_permissions=True)
 
 	return {"summary": summary, "log": doc.item_creation_log}
@@ -111,154 +330,138 @@ def import_bom_creator(docname):
 		frappe.throw(_("Please attach a PLM file before creating BOM Creator."))
 
 	file_doc, extension = get_file(doc.plm_file)
-	rows = load_rows(file_doc, extension)
 
-	if not rows or len(rows) < 2:
+	row_idxs = []
+	levels = []
+	item_codes = []
+	item_names = []
+	item_groups = []
+	qtys = []
+	uoms = []
+	row_idx = 1
+	with closing(load_rows(file_doc, extension)) as rows:
+		header_map = read_header_map(rows)
+		if "structure_level" not in header_map.values():
+			frappe.throw(_("Missing required column: Structure Level."))
+		if "item_code" not in header_map.values():
+			frappe.throw(_("Missing required column: Number / Item Code."))
+
+		read_row = build_row_reader(header_map)
+
+		for row_idx, row in enumerate(rows, start=2):
+			if is_blank_row(row):
+				continue
+
+			row_data = read_row(row)
+			item_code = cstr(row_data.get("item_code")).strip()
+			structure_level = row_data.get("structure_level")
+			if structure_level in (None, ""):
+				continue
+			if not item_code:
+				continue
+
+			level = cint(structure_level)
+			qty_value = row_data.get("qty")
+			qty, qty_uom = parse_qty_and_uom(qty_value)
+			uom = cstr(row_data.get("stock_uom")).strip()
+			if not uom and qty_uom:
+				uom = map_qty_uom(qty_uom) or ""
+
+			row_idxs.append(row_idx)
+			levels.append(level)
+			item_codes.append(item_code)
+			item_names.append(cstr(row_data.get("item_name")).strip())
+			item_groups.append(cstr(row_data.get("item_group")).strip())
+			qtys.append(qty)
+			uoms.append(uom)
+
+	if row_idx == 1:
 		frappe.throw(_("No data found in the attached file."))
+	if not levels:
+		frappe.throw(_("No valid rows found in the attached file."))
 
-	header_map = build_header_map(rows[0])
-	if "structure_level" not in header_map.values():
-		frappe.throw(_("Missing required column: Structure Level."))
-	if "item_code" not in header_map.values():
-		frappe.throw(_("Missing required column: Number / Item Code."))
-
-	nodes = []
-	for row_idx, row in enumerate(rows[1:], start=2):
-		if not any(row):
-			continue
-
-		row_data = extract_row_data(row, header_map)
-		item_code = cstr(row_data.get("item_code")).strip()
-		structure_level = row_data.get("structure_level")
-		if structure_level in (None, ""):
-			continue
-		if not item_code:
-			continue
-
-		level = cint(structure_level)
-		qty_value = row_data.get("qty")
-		qty, qty_uom = parse_qty_and_uom(qty_value)
-		uom = cstr(row_data.get("stock_uom")).strip()
-		if not uom and qty_uom:
-			uom = map_qty_uom(qty_uom) or ""
-
-		nodes.append(
-			{
-				"row_idx": row_idx,
-				"level": level,
-				"item_code": item_code,
-				"item_name": cstr(row_data.get("item_name")).strip(),
-				"item_group": cstr(row_data.get("item_group")).strip(),
-				"qty": qty,
-				"uom": uom,
-			}
+	root_index = levels.index(min(levels))
+	items = get_item_stock_uoms(set(item_codes[root_index:]))
+	root_item = items.get(item_codes[root_index].casefold())
+	if not root_item:
+		frappe.throw(
+			_("Root item {0} not found. Please create the item first.").format(item_codes[root_index])
 		)
 
-	if not nodes:
-		frappe.throw(_("No valid rows found in the attached file."))
-
-	min_level = min(node["level"] for node in nodes)
-	root = next(node for node in nodes if node["level"] == min_level)
-	root_index = nodes.index(root)
-	nodes = nodes[root_index:]
-	if not frappe.db.exists("Item", root["item_code"]):
-		frappe.throw(_("Root item {0} not found. Please create the item first.").format(root["item_code"]))
+	root_item_code, root_stock_uom = root_item
+	# children reference their parent by the stored Item name
+	item_codes[root_index] = root_item_code
 
 	logs = []
-	company = frappe.defaults.get_user_default("company") or frappe.defaults.get_global_default("company")
-	if not company:
-		frappe.throw(_("Default company is not set."))
+	company, currency = get_company_and_currency(doc)
 
-	currency = frappe.get_cached_value("Company", company, "default_currency")
-	if not currency:
-		frappe.throw(_("Default currency is not set for company {0}.").format(company))
-
-	bom_creator = frappe.new_doc("BOM Creator")
-	bom_creator.name = get_unique_bom_creator_name(root["item_code"])
-	bom_creator.company = company
-	bom_creator.currency = currency
-	bom_creator.rm_cost_as_per = "Valuation Rate"
-	bom_creator.item_code = root["item_code"]
-	bom_creator.qty = normalize_qty(root["qty"])
-
-	if root["item_name"]:
-		bom_creator.item_name = root["item_name"]
-	if root["item_group"]:
-		bom_creator.item_group = root["item_group"]
-
-	if root["uom"]:
-		bom_creator.uom = root["uom"]
-	else:
-		bom_creator.uom = frappe.get_cached_value("Item", root["item_code"], "stock_uom")
-
-	stack = [
-		{
-			"level": root["level"],
-			"item_code": root["item_code"],
-			"item_row_no": None,
-		}
-	]
+	# row_nos holds the BOM Creator row idx of each added node, "" for the root
+	parents = compute_parents(levels, root_index)
+	row_nos = [None] * len(levels)
+	row_nos[root_index] = ""
 
-	created = 0
+	child_rows = []
 	skipped = 0
-	errors = 0
 
-	for node in nodes[1:]:
-		level = node["level"]
-		while stack and level <= stack[-1]["level"]:
-			stack.pop()
+	for idx in range(root_index + 1, len(levels)):
+		item_code = item_codes[idx]
+		item = items.get(item_code.casefold())
 
-		if not stack:
-			logs.append(f"Row {node['row_idx']}: skipped {node['item_code']} (no parent found).")
+		parent = find_added_parent(parents, row_nos, idx)
+		if parent < 0:
+			logs.append((LOG_NO_PARENT, row_idxs[idx], item_code))
 			skipped += 1
 			continue
 
-		if not frappe.db.exists("Item", node["item_code"]):
-			logs.append(f"Row {node['row_idx']}: skipped {node['item_code']} (item not found).")
+		if not item:
+			logs.append((LOG_ITEM_NOT_FOUND, row_idxs[idx], item_code))
 			skipped += 1
 			continue
 
-		parent = stack[-1]
-		parent_row_no = parent["item_row_no"] if parent["item_row_no"] else ""
-		item_uom = node["uom"] or frappe.get_cached_value("Item", node["item_code"], "stock_uom")
-		item_qty = normalize_qty(node["qty"])
+		item_code, stock_uom = item
+		item_codes[idx] = item_code
+		item_uom = uoms[idx] or stock_uom
+		item_qty = normalize_qty(qtys[idx])
 
-		try:
-			row = bom_creator.append(
-				"items",
-				{
-					"item_code": node["item_code"],
-					"item_name": node["item_name"] or None,
-					"item_group": node["item_group"] or None,
-					"fg_item": parent["item_code"],
-					"qty": item_qty,
-					"uom": item_uom,
-					"stock_uom": item_uom,
-					"stock_qty": item_qty,
-					"allow_alternative_item": 1,
-					"parent_row_no": parent_row_no,
-				},
-			)
-			created += 1
-			stack.append(
-				{
-					"level": level,
-					"item_code": node["item_code"],
-					"item_row_no": row.idx,
-				}
-			)
-		except Exception:
-			logs.append(f"Row {node['row_idx']}: failed {node['item_code']} (see error log).")
-			errors += 1
+		child_rows.append(
+			{
+				"idx": len(child_rows) + 1,
+				"item_code": item_code,
+				"item_name": item_names[idx] or None,
+				"item_group": item_groups[idx] or None,
+				"fg_item": item_codes[parent],
+				"qty": item_qty,
+				"uom": item_uom,
+				"stock_uom": item_uom,
+				"stock_qty": item_qty,
+				"allow_alternative_item": 1,
+				"parent_row_no": row_nos[parent],
+			}
+		)
+		row_nos[idx] = len(child_rows)
+
+	bom_creator = frappe.get_doc(
+		{
+			"doctype": "BOM Creator",
+			"name": get_unique_bom_creator_name(root_item_code),
+			"company": company,
+			"currency": currency,
+			"rm_cost_as_per": "Valuation Rate",
+			"item_code": root_item_code,
+			"item_name": item_names[root_index] or None,
+			"item_group": item_groups[root_index] or None,
+			"qty": normalize_qty(qtys[root_index]),
+			"uom": uoms[root_index] or root_stock_uom,
+			"items": child_rows,
+		}
+	)
 
-	bom_creator.save(ignore_permissions=True)
-	bom_creator.set_rate_for_items()
-	bom_creator.save(ignore_permissions=True)
+	# BOM Creator prices its rows in before_save, once child names are set
+	bom_creator.insert(ignore_permissions=True)
 	bom_creator.submit()
 
-	summary = f"Created BOM Creator {bom_creator.name}. Items: {created}, Skipped: {skipped}, Errors: {errors}."
-	logs.insert(0, summary)
-	doc.bom_creation_log = "\n".join(logs)
+	summary = f"Created BOM Creator {bom_creator.name}. Items: {len(child_rows)}, Skipped: {skipped}."
+	doc.bom_creation_log = format_logs(summary, logs)
 	doc.bom_parent_item = bom_creator.name
 	doc.save(ignore_permissions=True)
 
@@ -279,17 +482,79 @@ def get_bom_for_bom_creator(bom_creator):
 	return {"bom": bom_name}
 
 
+def compute_parents(levels, start=0):
+	"""Return the index of each node's parent by structure level, or -1 if it has none.
+
+	Nodes before `start` are ignored.
+	"""
+	parents = [-1] * len(levels)
+	stack = []
+	for idx in range(start, len(levels)):
+		level = levels[idx]
+		while stack and level <= levels[stack[-1]]:
+			stack.pop()
+
+		if stack:
+			parents[idx] = stack[-1]
+		stack.append(idx)
+
+	return parents
+
+
+def find_added_parent(parents, row_nos, idx):
+	"""Return the nearest ancestor of `idx` that was added to the BOM, or -1 if there is none.
+
+	Skipped rows are not in the BOM, so their children hang off the next ancestor up.
+	"""
+	parent = parents[idx]
+	while parent >= 0 and row_nos[parent] is None:
+		parent = parents[parent]
+
+	return parent
+
+
+def get_company_and_currency(doc):
+	"""Resolve the company and its currency once and keep them on the tool for later runs."""
+	if doc.company and doc.currency:
+		return doc.company, doc.currency
+
+	company = (
+		doc.company
+		or frappe.defaults.get_user_default("company")
+		or frappe.defaults.get_global_default("company")
+	)
+	if not company:
+		frappe.throw(_("Default company is not set."))
+
+	currency = frappe.get_cached_value("Company", company, "default_currency")
+	if not currency:
+		frappe.throw(_("Default currency is not set for company {0}.").format(company))
+
+	doc.company = company
+	doc.currency = currency
+	return company, currency
+
+
+def format_logs(summary, logs):
+	return "\n".join([summary, *(template.format(*args) for template, *args in logs)])
+
+
 def get_unique_bom_creator_name(base_name):
 	base_name = cstr(base_name).strip()
-	if not frappe.db.exists("BOM Creator", base_name):
+	like_pattern = base_name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+	existing = frappe.get_all(
+		"BOM Creator",
+		or_filters=[["name", "=", base_name], ["name", "like", f"{like_pattern}-REV%"]],
+		pluck="name",
+	)
+
+	# names compare case-insensitively in the database
+	if base_name.casefold() not in {name.casefold() for name in existing}:
 		return base_name
 
-	index = 1
-	while True:
-		candidate = f"{base_name}-REV{index}"
-		if not frappe.db.exists("BOM Creator", candidate):
-			return candidate
-		index += 1
+	revision_pattern = re.compile(rf"{re.escape(base_name)}-REV(\d+)", re.IGNORECASE)
+	revisions = [int(match.group(1)) for name in existing if (match := revision_pattern.fullmatch(name))]
+	return f"{base_name}-REV{max(revisions, default=0) + 1}"
 
 
 def get_file(file_name):
@@ -304,53 +569,60 @@ def get_file(file_name):
 
 
 def load_rows(file_doc, extension):
+	"""Yield the rows of the attached file one at a time instead of reading it whole."""
 	if extension == "csv":
 		file_path = file_doc.get_full_path()
-		with open(file_path, newline="") as in_file:
-			return list(csv.reader(in_file))
+		with open(file_path, newline="", buffering=CSV_READ_BUFFER_SIZE) as in_file:
+			yield from csv.reader(in_file)
+		return
 
 	content = file_doc.get_content()
 	if extension == "xlsx":
-		return read_xlsx_file_from_attached_file(fcontent=content)
+		yield from iter_xlsx_rows(content)
+		return
 
-	return read_xls_file_from_attached_file(content)
+	yield from read_xls_file_from_attached_file(content)
 
 
-def build_header_map(headers):
-	aliases = {
-		"number": "item_code",
-		"item_code": "item_code",
-		"code": "item_code",
-		"name": "item_name",
-		"item_name": "item_name",
-		"description": "description",
-		"gst_hsn_code": "gst_hsn_code",
-		"gst_hsn": "gst_hsn_code",
-		"hsn_code": "gst_hsn_code",
-		"material": "custom_material",
-		"length": "custom_length",
-		"width": "custom_width",
-		"height": "custom_height",
-		"diameter": "custom_diameter",
-		"thickness": "custom_thickness",
-		"weight": "custom_weight",
-		"part_type": "item_group",
-		"parttype": "item_group",
-		"item_group": "item_group",
-		"uom": "stock_uom",
-		"stock_uom": "stock_uom",
-		"structure_level": "structure_level",
-		"level": "structure_level",
-		"structurelevel": "structure_level",
-		"qty": "qty",
-		"quantity": "qty",
-	}
+def iter_xlsx_rows(content):
+	workbook = load_workbook(filename=BytesIO(content), read_only=True, data_only=True)
+	try:
+		sheet = workbook.active
+		# read-only sheets trust the stored <dimension>, which some exporters leave stale
+		sheet.reset_dimensions()
+		yield from sheet.iter_rows(values_only=True)
+	finally:
+		workbook.close()
+
+
+def iter_chunks(iterable, size):
+	iterator = iter(iterable)
+	while chunk := list(islice(iterator, size)):
+		yield chunk
 
+
+def read_header_map(rows):
+	headers = next(rows, None)
+	if not headers:
+		frappe.throw(_("No data found in the attached file."))
+
+	return build_header_map(headers)
+
+
+def is_blank_row(row):
+	# csv.reader yields [] or [""] for empty lines, so settle those without scanning
+	if len(row) <= 1:
+		return not row or not row[0]
+
+	return not any(row)
+
+
+def build_header_map(headers):
 	header_map = {}
 	for idx, header in enumerate(headers):
-		normalized = frappe.scrub(cstr(header))
-		if normalized in aliases:
-			header_map[idx] = aliases[normalized]
+		normalized = cstr(header).lower().translate(HEADER_SCRUB_TABLE).strip("_")
+		if normalized in HEADER_ALIASES:
+			header_map[idx] = HEADER_ALIASES[normalized]
 
 	return header_map
 
@@ -367,6 +639,31 @@ def extract_row_data(row, header_map):
 	return row_data
 
 
+def build_row_reader(header_map):
+	"""Return a function mapping a row to its field values, specialised once per header."""
+	columns = tuple(header_map.items())
+	width = max(header_map, default=-1) + 1
+	interned = tuple(fieldname for fieldname in INTERNED_FIELDS if fieldname in header_map.values())
+
+	def read_row(row):
+		if len(row) < width:
+			row_data = extract_row_data(row, header_map)
+		else:
+			row_data = {
+				fieldname: value.strip() if isinstance(value := row[idx], str) else value
+				for idx, fieldname in columns
+			}
+
+		for fieldname in interned:
+			value = row_data.get(fieldname)
+			if isinstance(value, str):
+				row_data[fieldname] = sys.intern(value)
+
+		return row_data
+
+	return read_row
+
+
 def normalize_qty(value):
 	qty, _ = parse_qty_and_uom(value)
 	return qty if qty > 0 else 1
@@ -393,13 +690,267 @@ def map_qty_uom(uom):
 	return ""
 
 
+def prepare_item_rows(rows, read_row):
+	"""Parse raw `(row_idx, row)` pairs into Item column values without touching the database.
+
+	Returns `(row_idx, item_code, item_group, values)` tuples, where `values` is a list
+	following `ITEM_FIELDS` up to, but not including, `item_group`. Link values are not
+	checked here.
+	"""
+	prepared = []
+	for row_idx, row in rows:
+		if is_blank_row(row):
+			continue
+
+		row_data = read_row(row)
+		item_code = cstr(row_data.get("item_code")).strip()
+		item_name = cstr(row_data.get("item_name")).strip() or item_code
+
+		dimensions = []
+		for fieldname in ITEM_DIMENSION_FIELDS:
+			value = row_data.get(fieldname)
+			dimensions.append(flt(value) if value else 0)
+
+		prepared.append(
+			(
+				row_idx,
+				item_code,
+				cstr(row_data.get("item_group")).strip(),
+				[
+					item_code,
+					item_code,
+					item_name,
+					cstr(row_data.get("stock_uom")).strip() or "Nos",
+					row_data.get("description") or item_name,
+					cstr(row_data.get("gst_hsn_code")).strip() or None,
+					row_data.get("custom_material"),
+					*dimensions,
+				],
+			)
+		)
+
+	return prepared
+
+
+def flush_items(pending, logs):
+	"""Insert pending Item rows in one batch, bypassing the Item controller, and commit.
+
+	If the batch fails it is retried row by row so a single bad row does not take the
+	rest of the batch down with it. Returns the item codes that could not be inserted.
+	"""
+	if not pending:
+		return []
+
+	failed = []
+	try:
+		insert_items([values for _log_idx, _row_idx, values in pending])
+	except Exception:
+		for log_idx, row_idx, values in pending:
+			try:
+				insert_items([values])
+			except Exception:
+				frappe.log_error(title=f"PLM BOM Import Tool: could not create Item {values[0]}")
+				logs[log_idx] = (LOG_FAILED, row_idx, values[0])
+				failed.append(values[0])
+
+	frappe.db.commit()
+	return failed
+
+
+def insert_items(item_rows):
+	"""Bulk insert Items with the stock UOM row `Item.validate` would add to their conversion table.
+
+	Rows must already be validated: `import_items` checks the duplicate, Item Group, UOM and
+	GST HSN Code links itself. Everything else the Item controller does on insert is dropped
+	on purpose: the rest of `validate`, copying item defaults and taxes from the Item Group,
+	creating Item Price / opening stock, other apps' `doc_events` hooks and the version log.
+	"""
+	uom_rows = [
+		(
+			frappe.generate_hash(length=10),
+			values[0],
+			"Item",
+			"uoms",
+			1,
+			values[STOCK_UOM_INDEX],
+			1,
+			*values[-len(AUDIT_FIELDS) :],
+		)
+		for values in item_rows
+	]
+
+	frappe.db.savepoint(ITEM_SAVEPOINT)
+	try:
+		frappe.db.bulk_insert("Item", ITEM_FIELDS, item_rows)
+		frappe.db.bulk_insert("UOM Conversion Detail", UOM_CONVERSION_FIELDS, uom_rows)
+	except Exception:
+		frappe.db.rollback(save_point=ITEM_SAVEPOINT)
+		raise
+
+	frappe.db.release_savepoint(ITEM_SAVEPOINT)
+
+
+@contextmanager
+def deferred_item_indexes():
+	"""Drop the non-unique secondary indexes of Item for a bulk load and rebuild them afterwards.
+
+	The dropped definitions are committed under `DEFERRED_INDEXES_KEY` before the DDL runs, so
+	`restore_interrupted_index_loads` can rebuild them if the worker dies before `finally`.
+	Index DDL commits implicitly, so only wrap work that is committed as it goes.
+	"""
+	if frappe.db.db_type != "mariadb":
+		yield
+		return
+
+	# a previous load may have died with the indexes dropped
+	restore_deferred_item_indexes()
+
+	indexes = {}
+	for index in frappe.db.sql(
+		f"SHOW INDEX FROM `{DEFERRED_INDEX_TABLE}` WHERE Non_unique = 1 AND Index_type = 'BTREE'",
+		as_dict=True,
+	):
+		indexes.setdefault(index.Key_name, []).append((index.Column_name, index.Sub_part))
+
+	if not indexes:
+		yield
+		return
+
+	frappe.db.set_global(
+		DEFERRED_INDEXES_KEY, frappe.as_json({"table": DEFERRED_INDEX_TABLE, "indexes": indexes})
+	)
+	frappe.db.commit()
+
+	try:
+		frappe.db.sql_ddl(
+			f"ALTER TABLE `{DEFERRED_INDEX_TABLE}` "
+			+ ", ".join(f"DROP INDEX {quote_identifier(name)}" for name in indexes)
+		)
+		yield
+	finally:
+		restore_deferred_item_indexes()
+
+
+def restore_deferred_item_indexes():
+	"""Re-add the recorded Item indexes that are still missing and clear the record."""
+	record = frappe.db.get_global(DEFERRED_INDEXES_KEY)
+	if not record:
+		return
+
+	clauses, rejected = build_index_clauses(record, set(frappe.db.get_table_columns("Item")))
+	if rejected:
+		frappe.log_error(
+			title="PLM BOM Import Tool: rejected deferred Item indexes",
+			message=f"Not restored: {', '.join(rejected)}\n\n{record}",
+		)
+
+	present = {
+		index.Key_name for index in frappe.db.sql(f"SHOW INDEX FROM `{DEFERRED_INDEX_TABLE}`", as_dict=True)
+	}
+	missing = [clause for name, clause in clauses.items() if name not in present]
+	if missing:
+		frappe.db.sql_ddl(f"ALTER TABLE `{DEFERRED_INDEX_TABLE}` " + ", ".join(missing))
+
+	frappe.db.set_global(DEFERRED_INDEXES_KEY, None)
+	frappe.db.commit()
+
+
+def build_index_clauses(record, table_columns):
+	"""Return `({index name: ADD INDEX clause}, rejected index names)` for a deferred index record.
+
+	The record is checked rather than trusted: it must be for tabItem, and only indexes whose
+	name is a plain identifier and whose columns exist in `table_columns` are rebuilt.
+	"""
+	try:
+		deferred = json.loads(record)
+		table, indexes = deferred["table"], dict(deferred["indexes"])
+	except (ValueError, TypeError, KeyError):
+		return {}, ["<unreadable record>"]
+
+	if table != DEFERRED_INDEX_TABLE:
+		return {}, [f"<table {table!r}>"]
+
+	clauses = {}
+	rejected = []
+	for name, parts in indexes.items():
+		columns = []
+		try:
+			for column, sub_part in parts:
+				if column not in table_columns:
+					raise ValueError
+				if sub_part is not None and (type(sub_part) is not int or sub_part < 1):
+					raise ValueError
+
+				columns.append(quote_identifier(column) + (f"({sub_part})" if sub_part else ""))
+		except (ValueError, TypeError):
+			columns = []
+
+		if not columns or not isinstance(name, str) or not INDEX_NAME_PATTERN.fullmatch(name):
+			rejected.append(repr(name))
+			continue
+
+		clauses[name] = f"ADD INDEX {quote_identifier(name)} ({', '.join(columns)})"
+
+	return clauses, rejected
+
+
+def quote_identifier(name):
+	return "`" + name.replace("`", "``") + "`"
+
+
+def restore_interrupted_index_loads():
+	"""Rebuild Item indexes left dropped by a Fast Bulk Mode import whose worker was killed."""
+	if is_job_enqueued(FAST_BULK_JOB_ID) or is_job_enqueued(INDEX_RESTORE_JOB_ID):
+		return
+
+	restore_deferred_item_indexes()
+
+
+def get_existing_names(doctype, names):
+	"""Return `{casefolded name: stored name}` for the given names that exist in `doctype`."""
+	names = [name for name in names if name]
+	if not names:
+		return {}
+
+	return {
+		name.casefold(): name
+		for name in frappe.get_all(doctype, filters={"name": ["in", names]}, pluck="name")
+	}
+
+
+def get_item_stock_uoms(item_codes):
+	"""Return `{casefolded item code: (stored name, stock_uom)}` for the Items that exist."""
+	item_codes = [item_code for item_code in item_codes if item_code]
+	if not item_codes:
+		return {}
+
+	return {
+		name.casefold(): (name, stock_uom)
+		for name, stock_uom in frappe.get_all(
+			"Item",
+			filters={"name": ["in", item_codes]},
+			fields=["name", "stock_uom"],
+			as_list=True,
+		)
+	}
+
+
 def ensure_item_group(item_group):
-	if frappe.db.exists("Item Group", item_group):
-		return item_group
+	existing = frappe.db.exists("Item Group", item_group)
+	if existing:
+		return existing
 
 	group_doc = frappe.new_doc("Item Group")
 	group_doc.item_group_name = item_group
 	group_doc.parent_item_group = "All Item Groups"
 	group_doc.is_group = cint(0)
-	group_doc.insert(ignore_permissions=True)
+
+	frappe.db.savepoint(ITEM_GROUP_SAVEPOINT)
+	try:
+		group_doc.insert(ignore_permissions=True)
+	except Exception:
+		frappe.db.rollback(save_point=ITEM_GROUP_SAVEPOINT)
+		raise
+
+	frappe.db.release_savepoint(ITEM_GROUP_SAVEPOINT)
 	return group_doc.name
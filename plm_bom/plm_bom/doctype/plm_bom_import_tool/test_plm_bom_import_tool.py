@@ -2,8 +2,318 @@
 # See license.txt
 
 # import frappe
+import json
+from unittest.mock import MagicMock, patch
+
 from frappe.tests.utils import FrappeTestCase
 
+from plm_bom.plm_bom.doctype.plm_bom_import_tool.plm_bom_import_tool import (
+	ITEM_FIELDS,
+	LOG_CREATED,
+	LOG_DUPLICATE,
+	LOG_FAILED,
+	build_header_map,
+	build_index_clauses,
+	build_row_reader,
+	compute_parents,
+	create_items,
+	find_added_parent,
+	flush_items,
+	get_unique_bom_creator_name,
+	is_blank_row,
+	prepare_item_rows,
+	quote_identifier,
+)
+
+MODULE = "plm_bom.plm_bom.doctype.plm_bom_import_tool.plm_bom_import_tool"
+GET_ALL = f"{MODULE}.frappe.get_all"
+
+ITEM_HEADER = ["Number", "Name", "Part Type", "UOM"]
+
 
 class TestPLMBOMImportTool(FrappeTestCase):
-	pass
+	def test_compute_parents(self):
+		# 1
+		#   2
+		#     3
+		#   2
+		# 1
+		#   2
+		self.assertEqual(compute_parents([1, 2, 3, 2, 1, 2]), [-1, 0, 1, 0, -1, 4])
+
+	def test_compute_parents_with_level_gaps(self):
+		# a deeper level hangs off the last shallower node, however many levels it skips
+		self.assertEqual(compute_parents([1, 3, 4, 2, 5]), [-1, 0, 1, 0, 3])
+
+	def test_compute_parents_second_root_level_node(self):
+		parents = compute_parents([1, 2, 1, 2])
+		self.assertEqual(parents, [-1, 0, -1, 2])
+
+	def test_compute_parents_ignores_nodes_before_start(self):
+		# rows above the root are neither parents nor children
+		parents = compute_parents([3, 2, 1, 2, 3], start=2)
+		self.assertEqual(parents, [-1, -1, -1, 2, 3])
+
+	def test_find_added_parent_skips_missing_intermediate_nodes(self):
+		# 1 (root)
+		#   2 (skipped)
+		#     3
+		#       4
+		parents = compute_parents([1, 2, 3, 4])
+		row_nos = ["", None, 1, None]
+		self.assertEqual(find_added_parent(parents, row_nos, 2), 0)
+		self.assertEqual(find_added_parent(parents, row_nos, 3), 2)
+
+		row_nos[2] = None
+		self.assertEqual(find_added_parent(parents, row_nos, 3), 0)
+
+	def test_find_added_parent_without_ancestor(self):
+		parents = compute_parents([1, 2, 1, 2])
+		row_nos = ["", 1, None, None]
+		self.assertEqual(find_added_parent(parents, row_nos, 2), -1)
+		self.assertEqual(find_added_parent(parents, row_nos, 3), -1)
+
+	def test_is_blank_row(self):
+		for row in ([], [""], [None], ("", None, ""), (None, None)):
+			self.assertTrue(is_blank_row(row), row)
+
+		for row in (["A-1"], ["", "A-1"], (None, 0.5), (0, "x")):
+			self.assertFalse(is_blank_row(row), row)
+
+	def test_build_header_map(self):
+		headers = ["Number", " Item Name ", "Part-Type", "_UOM_", "Structure Level", "Unknown", None, "QTY"]
+		self.assertEqual(
+			build_header_map(headers),
+			{
+				0: "item_code",
+				1: "item_name",
+				2: "item_group",
+				3: "stock_uom",
+				4: "structure_level",
+				7: "qty",
+			},
+		)
+
+	def test_unique_bom_creator_name_when_free(self):
+		with patch(GET_ALL, return_value=[]) as get_all:
+			self.assertEqual(get_unique_bom_creator_name(" FG-100 "), "FG-100")
+
+		get_all.assert_called_once_with(
+			"BOM Creator",
+			or_filters=[["name", "=", "FG-100"], ["name", "like", "FG-100-REV%"]],
+			pluck="name",
+		)
+
+	def test_unique_bom_creator_name_escapes_like_wildcards(self):
+		with patch(GET_ALL, return_value=[]) as get_all:
+			get_unique_bom_creator_name("A_100%\\B")
+
+		self.assertEqual(
+			get_all.call_args.kwargs["or_filters"],
+			[["name", "=", "A_100%\\B"], ["name", "like", "A\\_100\\%\\\\B-REV%"]],
+		)
+
+	def test_unique_bom_creator_name_matches_base_case_insensitively(self):
+		with patch(GET_ALL, return_value=["fg-100"]):
+			self.assertEqual(get_unique_bom_creator_name("FG-100"), "FG-100-REV1")
+
+	def test_unique_bom_creator_name_takes_max_revision(self):
+		# gaps are not reused, so a new revision always sorts after the existing ones
+		existing = ["FG-100", "FG-100-REV1", "fg-100-rev4", "FG-100-REV2", "FG-100-REVX", "FG-100-REV3-A"]
+		with patch(GET_ALL, return_value=existing):
+			self.assertEqual(get_unique_bom_creator_name("FG-100"), "FG-100-REV5")
+
+	def test_build_index_clauses(self):
+		record = json.dumps(
+			{
+				"table": "tabItem",
+				"indexes": {
+					"item_name": [["item_name", None]],
+					"variant_of_index": [["variant_of", None], ["item_name", 10]],
+				},
+			}
+		)
+		clauses, rejected = build_index_clauses(record, {"name", "item_name", "variant_of"})
+		self.assertEqual(
+			clauses,
+			{
+				"item_name": "ADD INDEX `item_name` (`item_name`)",
+				"variant_of_index": "ADD INDEX `variant_of_index` (`variant_of`, `item_name`(10))",
+			},
+		)
+		self.assertEqual(rejected, [])
+
+	def test_build_index_clauses_rejects_injected_definitions(self):
+		record = json.dumps(
+			{
+				"table": "tabItem",
+				"indexes": {
+					"item_name": [["item_name", None]],
+					"column": [["name`), DROP COLUMN `x`, ADD INDEX `y` (`name", None]],
+					"index` (`name`), DROP COLUMN `x": [["item_name", None]],
+					"sub_part": [["item_name", "10), DROP COLUMN `x"]],
+					"shape": "item_name",
+				},
+			}
+		)
+		clauses, rejected = build_index_clauses(record, {"name", "item_name"})
+		self.assertEqual(list(clauses), ["item_name"])
+		self.assertEqual(len(rejected), 4)
+
+	def test_build_index_clauses_rejects_other_tables(self):
+		for record in (json.dumps({"table": "tabUser", "indexes": {"name": [["name", None]]}}), "[]", "{"):
+			clauses, rejected = build_index_clauses(record, {"name"})
+			self.assertEqual(clauses, {})
+			self.assertTrue(rejected)
+
+	def test_quote_identifier(self):
+		self.assertEqual(quote_identifier("item_name"), "`item_name`")
+		self.assertEqual(quote_identifier("a`b"), "`a``b`")
+
+	def test_build_row_reader_handles_short_rows(self):
+		read_row = build_row_reader(build_header_map(["Number", "Name", "Description", "UOM", "Part Type"]))
+
+		self.assertEqual(
+			read_row(["A-1", " Bolt ", "", " Nos ", "Hardware"]),
+			{
+				"item_code": "A-1",
+				"item_name": "Bolt",
+				"description": "",
+				"stock_uom": "Nos",
+				"item_group": "Hardware",
+			},
+		)
+		# XLSX rows and ragged CSV lines stop at their last filled cell
+		self.assertEqual(read_row(["A-1", " Bolt "]), {"item_code": "A-1", "item_name": "Bolt"})
+		self.assertEqual(
+			read_row(("A-1", None, None, 2.5)),
+			{"item_code": "A-1", "item_name": None, "description": None, "stock_uom": 2.5},
+		)
+
+	def test_build_row_reader_interns_repeated_values(self):
+		read_row = build_row_reader(build_header_map(["Number", "UOM", "Part Type"]))
+		first = read_row(["A-1", "".join(["N", "os"]), "".join(["Hard", "ware"])])
+		second = read_row(["B-2", "".join(["No", "s"]), "".join(["Hardw", "are "])])
+		short = read_row(["C-3", "".join(["Nos", " "])])
+
+		self.assertIs(first["stock_uom"], second["stock_uom"])
+		self.assertIs(first["stock_uom"], short["stock_uom"])
+		self.assertIs(first["item_group"], second["item_group"])
+
+	def test_prepare_item_rows_follows_item_fields(self):
+		read_row = build_row_reader(
+			build_header_map([*ITEM_HEADER, "Description", "HSN Code", "Material", "Length", "Weight"])
+		)
+		rows = [
+			(2, ["A-1", "Bolt", "Hardware", "Kg", "M8 bolt", "7318", "Steel", "12.5", ""]),
+			(3, ["", "", "", "", "", "", "", "", ""]),
+			(4, ["B-2", "", "Hardware", "", "", "", "", "", "3"]),
+		]
+
+		prepared = prepare_item_rows(rows, read_row)
+		self.assertEqual(
+			prepared,
+			[
+				(
+					2,
+					"A-1",
+					"Hardware",
+					["A-1", "A-1", "Bolt", "Kg", "M8 bolt", "7318", "Steel", 12.5, 0, 0, 0, 0, 0],
+				),
+				# item name and description fall back to the code, the stock UOM to Nos
+				(4, "B-2", "Hardware", ["B-2", "B-2", "B-2", "Nos", "B-2", None, "", 0, 0, 0, 0, 0, 3.0]),
+			],
+		)
+		self.assertEqual(ITEM_FIELDS[len(prepared[0][3])], "item_group")
+
+	def test_flush_items_retries_a_failed_batch_row_by_row(self):
+		pending = [
+			(idx, idx + 2, (item_code, item_code)) for idx, item_code in enumerate(("A-1", "BAD", "C-3"))
+		]
+		logs = [(LOG_CREATED, row_idx, values[0]) for _log_idx, row_idx, values in pending]
+
+		with (
+			patch(f"{MODULE}.insert_items", side_effect=fail_on_bad_item) as insert_items,
+			patch(f"{MODULE}.frappe.log_error"),
+			patch(f"{MODULE}.frappe.db.commit"),
+		):
+			failed = flush_items(pending, logs)
+
+		self.assertEqual(failed, ["BAD"])
+		self.assertEqual(insert_items.call_count, 4)
+		self.assertEqual(logs, [(LOG_CREATED, 2, "A-1"), (LOG_FAILED, 3, "BAD"), (LOG_CREATED, 4, "C-3")])
+
+	def test_create_items_skips_case_insensitive_duplicates_in_the_file(self):
+		rows = [
+			ITEM_HEADER,
+			["A-1", "Bolt", "Hardware", "Nos"],
+			["a-1", "Bolt again", "Hardware", "Nos"],
+			["B-2", "Nut", "hardware", "nos"],
+		]
+		doc, insert_items = run_create_items(rows)
+
+		self.assertEqual(
+			doc.item_creation_log.splitlines(),
+			[
+				"Created: 2, Duplicates: 1, Skipped: 0, Errors: 0.",
+				LOG_CREATED.format(2, "A-1"),
+				LOG_DUPLICATE.format(3, "a-1"),
+				LOG_CREATED.format(4, "B-2"),
+			],
+		)
+		# Link values are stored under the names they exist with
+		(item_rows,) = insert_items.call_args.args
+		fields = [ITEM_FIELDS.index(fieldname) for fieldname in ("name", "stock_uom", "item_group")]
+		self.assertEqual(
+			[tuple(row[idx] for idx in fields) for row in item_rows],
+			[("A-1", "Nos", "Hardware"), ("B-2", "Nos", "Hardware")],
+		)
+
+	def test_create_items_forgets_items_that_failed_to_insert(self):
+		rows = [
+			ITEM_HEADER,
+			["A-1", "Bolt", "Hardware", "Nos"],
+			["BAD", "Broken", "Hardware", "Nos"],
+			["bad", "Fixed", "Hardware", "Nos"],
+		]
+		with patch(f"{MODULE}.ITEM_BATCH_SIZE", 2):
+			doc, _insert_items = run_create_items(rows)
+
+		# the failed row is not treated as existing when the next chunk repeats its code
+		self.assertEqual(
+			doc.item_creation_log.splitlines(),
+			[
+				"Created: 2, Duplicates: 0, Skipped: 0, Errors: 1.",
+				LOG_CREATED.format(2, "A-1"),
+				LOG_FAILED.format(3, "BAD"),
+				LOG_CREATED.format(4, "bad"),
+			],
+		)
+
+
+def fail_on_bad_item(item_rows):
+	if any(values[0] == "BAD" for values in item_rows):
+		raise Exception("insert failed")
+
+
+def run_create_items(rows):
+	"""Run `create_items` over `rows` with no Items in the database and only Nos / Hardware as links."""
+	links = {"UOM": {"nos": "Nos"}, "Item Group": {"hardware": "Hardware"}}
+
+	def get_existing_names(doctype, names):
+		existing = links.get(doctype, {})
+		return {name.casefold(): existing[name.casefold()] for name in names if name.casefold() in existing}
+
+	doc = MagicMock(plm_file="/files/plm.csv")
+	with (
+		patch(f"{MODULE}.get_file", return_value=(None, "csv")),
+		patch(f"{MODULE}.load_rows", return_value=(row for row in rows)),
+		patch(f"{MODULE}.get_existing_names", side_effect=get_existing_names),
+		patch(f"{MODULE}.ensure_item_group", side_effect=AssertionError),
+		patch(f"{MODULE}.insert_items", side_effect=fail_on_bad_item) as insert_items,
+		patch(f"{MODULE}.frappe.log_error"),
+		patch(f"{MODULE}.frappe.db.commit"),
+	):
+		create_items(doc)
+
+	return doc, insert_items